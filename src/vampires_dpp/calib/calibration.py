@@ -1,5 +1,6 @@
 # library functions for common calibration tasks like
 # background subtraction, collapsing cubes
+from functools import lru_cache
 from pathlib import Path
 
 import astropy.units as u
@@ -16,7 +17,25 @@ from vampires_dpp.paths import get_paths
 from vampires_dpp.util import load_fits, wrap_angle
 from vampires_dpp.wcs import apply_wcs, get_coord_header
 
-__all__ = ("apply_coordinate", "calibrate_file")
+__all__ = ("apply_coordinate", "calibrate_file", "load_calib_frames")
+
+
+@lru_cache(maxsize=None)
+def load_calib_frames(filename: str) -> tuple[NDArray, NDArray, fits.Header]:
+    """Load and cache the data, error, and header of a master calibration file.
+
+    A run only uses a handful of master backgrounds/flats across all of its
+    input files, so the decoded arrays are cached per process. `Pipeline.run`
+    warms this cache in the parent before forking its worker pool, letting the
+    workers share the arrays through copy-on-write instead of re-reading and
+    re-decoding the same FITS files for every input. The cached arrays must not
+    be mutated by callers.
+    """
+    with fits.open(filename, memmap=False) as hdul:
+        data = np.ascontiguousarray(hdul[0].data, dtype="f4")
+        err = np.ascontiguousarray(hdul["ERR"].data, dtype="f4")
+        header = hdul[0].header.copy()
+    return data, err, header
 
 
 def apply_coordinate(image: NDArray, header, coord: SkyCoord | None = None):
@@ -67,13 +86,10 @@ def calibrate_file(
     if back_filename is not None:
         back_path = Path(back_filename)
         header["BACKFILE"] = back_path.name
-        with fits.open(back_path) as hdul:
-            assert hdul[0].header["U_CAMERA"] == header["U_CAMERA"]
-            background = hdul[0].data.astype("f4")
-            back_hdr = hdul[0].header
-            back_err = hdul["ERR"].data.astype("f4")
-            header["NOISEADU"] = back_hdr["NOISEADU"], back_hdr.comments["NOISEADU"]
-            header["NOISE"] = back_hdr["NOISE"], back_hdr.comments["NOISE"]
+        background, back_err, back_hdr = load_calib_frames(str(back_path))
+        assert back_hdr["U_CAMERA"] == header["U_CAMERA"]
+        header["NOISEADU"] = back_hdr["NOISEADU"], back_hdr.comments["NOISEADU"]
+        header["NOISE"] = back_hdr["NOISE"], back_hdr.comments["NOISE"]
         cube -= background
     else:
         cube -= header["BIAS"]
@@ -83,14 +99,12 @@ def calibrate_file(
     if flat_filename is not None:
         flat_path = Path(flat_filename)
         header["FLATFILE"] = flat_path.name
-        with fits.open(flat_path) as hdul:
-            assert hdul[0].header["U_CAMERA"] == header["U_CAMERA"]
-            flat = hdul[0].data.astype("f4")
-            flat_hdr = hdul[0].header
-            flat[flat == 0] = np.nan
-            flat_err = hdul["ERR"].data.astype("f4")
-            if "NORMVAL" in flat_hdr:
-                header["NORMVAL"] = flat_hdr["NORMVAL"], flat_hdr.comments["NORMVAL"]
+        flat_data, flat_err, flat_hdr = load_calib_frames(str(flat_path))
+        assert flat_hdr["U_CAMERA"] == header["U_CAMERA"]
+        # NaN out dead pixels without mutating the cached array
+        flat = np.where(flat_data == 0, np.nan, flat_data)
+        if "NORMVAL" in flat_hdr:
+            header["NORMVAL"] = flat_hdr["NORMVAL"], flat_hdr.comments["NORMVAL"]
 
         unnorm_cube = cube.copy()
         unnorm_cube[unnorm_cube == 0] = np.nan
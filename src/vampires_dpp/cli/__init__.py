@@ -2,9 +2,17 @@ import sys
 
 from loguru import logger
 
+# enqueue routes records through a queue to a single writer thread, so worker
+# processes never block on the stream lock (matches the debug-log file sinks)
 logger.configure(
     handlers=[
-        dict(sink=sys.stderr, level="INFO", format="[{time:hh:mm:ss.SSS}] {message}", colorize=True)
+        dict(
+            sink=sys.stderr,
+            level="INFO",
+            format="[{time:hh:mm:ss.SSS}] {message}",
+            colorize=True,
+            enqueue=True,
+        )
     ]
 )
 logger.enable("vampires_dpp")
@@ -1,4 +1,5 @@
 import warnings
+from functools import lru_cache
 
 import numpy as np
 from astropy.io import fits
@@ -9,6 +10,13 @@ from vampires_dpp.constants import CMOSVAMPIRES, EMCCDVAMPIRES, SUBARU_LOC, Inst
 from vampires_dpp.util import hst_from_ut_time, iso_time_stats, mjd_time_stats, wrap_angle
 
 
+@lru_cache(maxsize=4)
+def _lat_trig(lat: float) -> tuple[float, float, float]:
+    """Cache the latitude trig terms; the site latitude rarely changes across a run."""
+    _lat = np.deg2rad(lat)
+    return np.sin(_lat), np.cos(_lat), np.tan(_lat)
+
+
 def parallactic_angle(time, coord):
     pa = parallactic_angle_hadec(
         time.sidereal_time("apparent").hourangle - coord.ra.hourangle, coord.dec.deg
@@ -26,7 +34,8 @@ def parallactic_angle_hadec(ha, dec, lat=SUBARU_LOC.lat.deg):
     Parameters
     ----------
     ha : float
-        hour-angle, in hour angles
+        hour-angle, in hour angles. May be an array, in which case the
+        parallactic angles are computed element-wise.
     dec : float
         declination in degrees
     lat : float, optional
@@ -37,12 +46,12 @@ def parallactic_angle_hadec(ha, dec, lat=SUBARU_LOC.lat.deg):
     float
         parallactic angle, in degrees East of North
     """
-    _ha = ha * np.pi / 12  # hour angle to radian
+    _ha = np.asanyarray(ha) * np.pi / 12  # hour angle to radian
     _dec = np.deg2rad(dec)
-    _lat = np.deg2rad(lat)
+    *_, tan_lat = _lat_trig(lat)
     sin_ha, cos_ha = np.sin(_ha), np.cos(_ha)
     sin_dec, cos_dec = np.sin(_dec), np.cos(_dec)
-    pa = np.arctan2(sin_ha, np.tan(_lat) * cos_dec - sin_dec * cos_ha)
+    pa = np.arctan2(sin_ha, tan_lat * cos_dec - sin_dec * cos_ha)
     return np.rad2deg(pa)
 
 
@@ -52,7 +61,8 @@ def parallactic_angle_altaz(alt, az, lat=SUBARU_LOC.lat.deg):
     Parameters
     ----------
     alt : float
-        altitude or elevation, in degrees
+        altitude or elevation, in degrees. May be an array, in which case the
+        parallactic angles are computed element-wise.
     az : float
         azimuth, in degrees CCW from North
     lat : float, optional
@@ -67,17 +77,16 @@ def parallactic_angle_altaz(alt, az, lat=SUBARU_LOC.lat.deg):
     # get angles, rotate az to S
     _az = np.deg2rad(az) - np.pi
     _alt = np.deg2rad(alt)
-    _lat = np.deg2rad(lat)
     # calculate values ahead of time
     sin_az, cos_az = np.sin(_az), np.cos(_az)
     sin_alt, cos_alt = np.sin(_alt), np.cos(_alt)
-    sin_lat, cos_lat = np.sin(_lat), np.cos(_lat)
+    sin_lat, cos_lat, tan_lat = _lat_trig(lat)
     # get declination
     dec = np.arcsin(sin_alt * sin_lat - cos_alt * cos_lat * cos_az)
     # get hour angle
     ha = np.arctan2(sin_az, cos_az * sin_lat + np.tan(_alt) * cos_lat)
     # get parallactic angle
-    pa = np.arctan2(np.sin(ha), np.tan(_lat) * np.cos(dec) - np.sin(dec) * np.cos(ha))
+    pa = np.arctan2(np.sin(ha), tan_lat * np.cos(dec) - np.sin(dec) * np.cos(ha))
     return np.rad2deg(pa)
 
 
@@ -202,15 +211,26 @@ def update_header_mjd(header: fits.Header) -> fits.Header:
     return header
 
 
+@lru_cache(maxsize=8)
+def _cached_instrument(cam_num: int, emgain=None, readmode=None) -> InstrumentInfo:
+    if emgain is not None:
+        return EMCCDVAMPIRES(cam_num=cam_num, emgain=emgain)
+    return CMOSVAMPIRES(cam_num=cam_num, readmode=readmode)
+
+
 def get_instrument_from(header: fits.Header) -> InstrumentInfo:
-    """Get the instrument info from a FITS header"""
+    """Get the instrument info from a FITS header
+
+    The instrument parameters are identical across the files of a run, so the
+    constructed objects are cached on (camera, EM gain/read mode).
+    """
     cam_num = int(header["U_CAMERA"])
     if "U_EMGAIN" in header:
-        inst = EMCCDVAMPIRES(cam_num=cam_num, emgain=header["U_EMGAIN"])
-    else:
-        inst = CMOSVAMPIRES(cam_num=cam_num, readmode=header["U_DETMOD"].lower())
+        return _cached_instrument(cam_num, emgain=header["U_EMGAIN"])
+    return _cached_instrument(cam_num, readmode=header["U_DETMOD"].lower())
+
 
-    return inst
+_STRUCTURAL_KEYS = frozenset(("SIMPLE", "BITPIX", "EXTEND", "COMMENT", "HISTORY"))
 
 
 def sort_header(header: fits.Header) -> fits.Header:
@@ -218,7 +238,7 @@ def sort_header(header: fits.Header) -> fits.Header:
     output_header = fits.Header()
     for key in sorted(header):
         # skip structural keys
-        if key in ("SIMPLE", "BITPIX", "EXTEND", "COMMENT", "HISTORY") or key.startswith("NAXIS"):
+        if key in _STRUCTURAL_KEYS or key.startswith("NAXIS"):
             continue
         with warnings.catch_warnings():
             warnings.simplefilter("ignore", AstropyWarning)
@@ -1,9 +1,8 @@
-import warnings
-
 import bottleneck as bn
 import cv2
 import numpy as np
 from numpy.typing import ArrayLike, NDArray
+from scipy import ndimage
 
 from vampires_dpp.indexing import cutout_inds, frame_center, frame_radii
 
@@ -105,9 +104,17 @@ def derotate_cube(data: ArrayLike, angles: ArrayLike | float, **kwargs) -> NDArr
     # uses swapped axes for this parameter only
     angles = np.asarray(angles)
     rotated = np.empty_like(data)
-    # if angles is a scalar, broadcoast along frame index
+    # if angles is a scalar, every frame shares one rotation matrix, so build
+    # it once instead of once per frame (e.g. data and error planes of the
+    # same file both derotate by DEROTANG)
     if angles.size == 1:
-        angles = np.full(rotated.shape[0], angles)
+        center = kwargs.pop("center", None)
+        if center is None:
+            center = frame_center(data)
+        matrix = cv2.getRotationMatrix2D(center[::-1], -float(angles.item()), 1)
+        for idx in range(rotated.shape[0]):
+            rotated[idx] = warp_frame(data[idx], matrix, **kwargs)
+        return rotated
     for idx in range(rotated.shape[0]):
         rotated[idx] = derotate_frame(data[idx], angles[idx], **kwargs)
     return rotated
@@ -136,15 +143,15 @@ def shift_cube(cube: ArrayLike, shifts: ArrayLike, **kwargs) -> NDArray:
 
 def radial_profile_image(frame, fwhm=3):
     rs = frame_radii(frame)
-    bins = np.arange(rs.min(), rs.max())
-    output = np.zeros_like(frame)
-    for r in bins:
-        mask = (rs >= r - fwhm / 2) & (rs < r + fwhm / 2)
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
-            output[mask] = np.nanmedian(frame[mask])
-
-    return output
+    # non-overlapping annulus labels of width `fwhm`; non-finite pixels are
+    # relegated to the background label (0) so they are excluded from the medians
+    labels = ((rs - rs.min()) // fwhm).astype(int) + 1
+    labels[~np.isfinite(frame)] = 0
+    index = np.arange(1, labels.max() + 1)
+    # single labelled median pass instead of one masked reduction per radius
+    profile = ndimage.median(frame, labels=labels, index=index)
+    output = np.where(labels > 0, np.take(profile, labels - 1, mode="clip"), 0)
+    return output.astype(frame.dtype, copy=False)
 
 
 def pad_cube(cube, pad_width: int, header=None, **pad_kwargs):
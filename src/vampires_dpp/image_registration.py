@@ -5,12 +5,13 @@ from typing import Literal, TypeAlias
 import cv2
 import matplotlib.pyplot as plt
 import numpy as np
-from astropy.convolution import convolve_fft
 from astropy.io import fits
 from astropy.nddata import Cutout2D
+from astropy.nddata.utils import overlap_slices
 from astropy.visualization import simple_norm
 from image_registration import chi2_shift
 from photutils import centroids
+from scipy.signal import fftconvolve
 from skimage import filters, transform
 
 from vampires_dpp.headers import fix_header
@@ -18,7 +19,7 @@ from vampires_dpp.image_processing import shift_frame, warp_frame
 from vampires_dpp.indexing import cutout_inds, frame_center, frame_radii, get_mbi_centers
 from vampires_dpp.specphot.filters import determine_filterset_from_header
 from vampires_dpp.synthpsf import create_synth_psf
-from vampires_dpp.util import get_center
+from vampires_dpp.util import get_centers
 
 __all__ = ("register_hdul",)
 
@@ -27,6 +28,28 @@ logger = logging.getLogger(__file__)
 RegisterMethod: TypeAlias = Literal["peak", "com", "dft"]
 
 
+def psf_convolve(image, psf):
+    """Normalized FFT convolution of an image with a PSF kernel.
+
+    Matches astropy's ``convolve_fft`` with ``nan_treatment="interpolate"`` —
+    non-finite pixels are replaced by the kernel-weighted interpolation of their
+    neighborhood — but goes through scipy's fftconvolve, which avoids astropy's
+    per-call padding bookkeeping and is substantially faster.
+    """
+    kernel = psf / psf.sum()
+    finite = np.isfinite(image)
+    if finite.all():
+        return fftconvolve(image, kernel, mode="same")
+    filled = np.where(finite, image, 0)
+    conv = fftconvolve(filled, kernel, mode="same")
+    # interpolation weight: fraction of finite kernel support, relative to the
+    # full in-image support so the zero-padded boundary is not renormalized
+    coverage = fftconvolve(finite.astype("f8"), kernel, mode="same")
+    full = fftconvolve(np.ones_like(coverage), kernel, mode="same")
+    norm = coverage / full
+    return conv / np.where(norm <= 0, 1, norm)
+
+
 def offset_dft(frame, inds, psf):
     cutout = frame[inds]
     xoff, yoff = chi2_shift(psf, cutout, upsample_factor="auto", return_error=False)
@@ -57,6 +80,36 @@ def offset_peak_and_com(frame, inds):
     return ctrs
 
 
+def peak_and_com_stack(cutouts):
+    """Peak indices and nan-masked centers of mass for a stack of cutouts.
+
+    Returns (Nstack, 2) arrays in cutout coordinates, computed with vectorized
+    numpy reductions instead of calling photutils once per cutout, which is
+    dominated by Python call overhead for small windows.
+    """
+    flat = cutouts.reshape(cutouts.shape[0], -1)
+    peak_ys, peak_xs = np.unravel_index(np.nanargmax(flat, axis=-1), cutouts.shape[-2:])
+    # nan-masked center of mass, weights summed against shared index grids
+    weights = np.where(np.isfinite(cutouts), cutouts, 0)
+    totals = weights.sum(axis=(-2, -1))
+    ys, xs = np.indices(cutouts.shape[-2:])
+    com_ys = np.einsum("ijk,jk->i", weights, ys) / totals
+    com_xs = np.einsum("ijk,jk->i", weights, xs) / totals
+    ctrs = {
+        "peak": np.stack((peak_ys, peak_xs), axis=-1),
+        "com": np.stack((com_ys, com_xs), axis=-1),
+    }
+    return ctrs
+
+
+def offset_peak_and_com_batch(cube, inds):
+    """Batched version of `offset_peak_and_com` over the frame axis of a cube."""
+    ctrs = peak_and_com_stack(cube[inds])
+    # offset based on indices
+    offset = np.array((inds[-2].start, inds[-1].start))
+    return {key: vals + offset for key, vals in ctrs.items()}
+
+
 def intersect_point(xs, ys):
     # sort points so we know how to pair into intersecting lines
     idxs = np.argsort(xs, axis=-1)
@@ -115,10 +168,7 @@ def register_hdul(
     elif init_centroids is not None:
         init_centroids = np.mean(list(init_centroids.values()), axis=1)
         centroids = np.zeros((nframes, len(init_centroids), 2))
-        for j in range(centroids.shape[1]):
-            centroids[:, j] = get_center(
-                hdul[0].data, init_centroids[j], hdul[0].header["U_CAMERA"]
-            )
+        centroids[:] = get_centers(hdul[0].data, init_centroids, hdul[0].header["U_CAMERA"])
     elif "MBIR" in header["OBS-MOD"]:
         ctr_dict = get_mbi_centers(hdul[0].data, reduced=True)
         centroids = np.zeros((nframes, 3, 2))
@@ -135,6 +185,13 @@ def register_hdul(
 
     if reproject_tforms is not None and hdul[0].header["U_CAMERA"] == 2:
         tforms = [reproject_tforms[field] for field in fields]
+        # the shifted frames always have shape (crop_width, crop_width), so the
+        # rotation matrices are constant per field and can be built once
+        shifted_ctr = ((crop_width - 1) / 2, (crop_width - 1) / 2)
+        rotmats = [
+            cv2.getRotationMatrix2D(shifted_ctr, np.rad2deg(tform.rotation), tform.scale)
+            for tform in tforms
+        ]
     else:
         tforms = None
     # determine maximum padding, with sqrt(2)
@@ -143,37 +200,50 @@ def register_hdul(
     # round to nearest even number
     npad = int((rad_factor // 2) * 2)
     npix = crop_width + 2 * npad
-    aligned_cube = np.empty((*centroids.shape[:2], npix, npix), dtype="f4")
-    aligned_err_cube = np.empty((*centroids.shape[:2], npix, npix), dtype="f4")
+    # prefill the padding with NaN once so shifted frames can be written
+    # directly into the interior, instead of np.pad allocating per frame
+    aligned_cube = np.full((*centroids.shape[:2], npix, npix), np.nan, dtype="f4")
+    aligned_err_cube = np.full((*centroids.shape[:2], npix, npix), np.nan, dtype="f4")
+    interior = slice(npad, npad + crop_width)
+    data_cube = hdul[0].data
+    err_cube = hdul["ERR"].data
+    # scratch buffers for the partial-overlap cutouts, shared across frames
+    cutout_shape = (crop_width, crop_width)
+    cutout_buf = np.empty(cutout_shape, dtype="f4")
+    cutout_err_buf = np.empty(cutout_shape, dtype="f4")
     for tidx in range(centroids.shape[0]):
-        frame = hdul[0].data[tidx]
-        frame_err = hdul["ERR"].data[tidx]
+        frame = data_cube[tidx]
+        frame_err = err_cube[tidx]
 
         for wlidx in range(centroids.shape[1]):
             # determine offset for each field
             field_ctr = centroids[tidx, wlidx]
-            # generate cutouts with crop width
-            cutout = Cutout2D(frame, field_ctr[::-1], size=crop_width, mode="partial")
-            cutout_err = Cutout2D(frame_err, field_ctr[::-1], size=crop_width, mode="partial")
+            # compute the partial-overlap slices once and share them between the
+            # data and error frames instead of building two Cutout2D objects
+            slc_orig, slc_cut = overlap_slices(
+                frame.shape, cutout_shape, field_ctr, mode="partial"
+            )
+            cutout_buf.fill(np.nan)
+            cutout_buf[slc_cut] = frame[slc_orig]
+            cutout_err_buf.fill(np.nan)
+            cutout_err_buf[slc_cut] = frame_err[slc_orig]
 
-            offset = field_ctr - cutout.position_original[::-1]
+            # subpixel residual from the rounded cutout center
+            offset = field_ctr - np.floor(field_ctr + 0.5)
 
             # shift arrays, since it's subpixel don't worry about losing edges
-            shifted = shift_frame(cutout.data, offset)
-            shifted_err = shift_frame(cutout_err.data, offset)
+            shifted = shift_frame(cutout_buf, offset)
+            shifted_err = shift_frame(cutout_err_buf, offset)
 
             # if reprojecting, scale + rotate images
             if tforms is not None:
-                rotmat = cv2.getRotationMatrix2D(
-                    frame_center(shifted), np.rad2deg(tforms[wlidx].rotation), tforms[wlidx].scale
-                )
                 antialias = tforms[wlidx].scale < 1  # anti-alias if shrinking frame
-                shifted = warp_frame(shifted, rotmat, antialias=antialias)
-                shifted_err = warp_frame(shifted_err, rotmat, antialias=antialias)
+                shifted = warp_frame(shifted, rotmats[wlidx], antialias=antialias)
+                shifted_err = warp_frame(shifted_err, rotmats[wlidx], antialias=antialias)
 
-            # pad output
-            aligned_cube[tidx, wlidx] = np.pad(shifted, npad, constant_values=np.nan)
-            aligned_err_cube[tidx, wlidx] = np.pad(shifted_err, npad, constant_values=np.nan)
+            # write into the NaN-padded output buffer
+            aligned_cube[tidx, wlidx, interior, interior] = shifted
+            aligned_err_cube[tidx, wlidx, interior, interior] = shifted_err
 
     # generate output HDUList
     output_hdul = fits.HDUList(
@@ -215,18 +285,22 @@ def recenter_hdul(
     ## Measure centroid
     for wl_idx in range(data_cube.shape[0]):
         frame = data_cube[wl_idx]
-        offsets = []
-        for offset in window_offsets[wl_idx]:
-            inds = Cutout2D(frame, (field_center + offset)[::-1], window_size).slices_original[::-1]
-            match method:
-                case "com" | "peak":
-                    center = offset_peak_and_com(frame, inds)[method]
-                case "dft":
-                    assert psfs is not None
-                    center = offset_dft(frame, inds, psf=psfs[wl_idx])
-
-            offsets.append(field_center - center)
-        offsets = np.array(offsets)
+        inds_list = [
+            Cutout2D(frame, (field_center + offset)[::-1], window_size).slices_original[::-1]
+            for offset in window_offsets[wl_idx]
+        ]
+        match method:
+            case "com" | "peak":
+                # batch all windows' centroids through one vectorized call
+                origins = np.array([(inds[-2].start, inds[-1].start) for inds in inds_list])
+                cutouts = np.stack([frame[inds] for inds in inds_list])
+                centers = peak_and_com_stack(cutouts)[method] + origins
+            case "dft":
+                assert psfs is not None
+                centers = np.array(
+                    [offset_dft(frame, inds, psf=psfs[wl_idx]) for inds in inds_list]
+                )
+        offsets = field_center - centers
         if len(offsets) == 4:
             ox, oy = intersect_point(offsets[:, 1], offsets[:, 0])
             offset = np.array((oy, ox))
@@ -418,7 +492,7 @@ def autocentroid_hdul(
         # to run the autocentroid on a big stack of mean-combined data instead of individual frames
         filtered_cutout = rough_cutout.data - filters.median(rough_cutout.data, np.ones((9, 9)))
         # convolve high-pass filtered data with the PSF for better S/N (unsharp-mask-ish)
-        filtered_cutout = convolve_fft(filtered_cutout, psfs[idx])
+        filtered_cutout = psf_convolve(filtered_cutout, psfs[idx])
 
         # when using the coronagraph, find four maxima which form a square
         if coronagraphic:
@@ -516,7 +590,7 @@ def fit_ellipse_to_image(data, psf=None):
         blurred = cv2.medianBlur(gray_img, 5)
     else:
         gray_psf = np.array((psf - psf.min()) / (psf.max() - psf.min()) * 255, dtype=np.uint8)
-        blurred = convolve_fft(gray_img, gray_psf)
+        blurred = psf_convolve(gray_img, gray_psf)
 
     _, thresholded = cv2.threshold(
         blurred.astype(np.uint8), 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import Literal
 
 import numpy as np
@@ -38,12 +39,23 @@ def frame_radii(frame: ArrayLike, center=None) -> NDArray:
         Matrix with frame radii
     """
     if center is None:
-        center = frame_center(frame)
+        return _frame_radii_default(frame.shape[-2:])
     Ys, Xs = np.ogrid[: frame.shape[-2], : frame.shape[-1]]
     radii = np.hypot(Ys - center[-2], Xs - center[-1])
     return radii
 
 
+@lru_cache(maxsize=32)
+def _frame_radii_default(shape: tuple[int, int]) -> NDArray:
+    # center-referenced radii are a pure function of the frame shape; the
+    # cached array is marked read-only since every caller shares it
+    cy, cx = (shape[-2] - 1) / 2, (shape[-1] - 1) / 2
+    Ys, Xs = np.ogrid[: shape[-2], : shape[-1]]
+    radii = np.hypot(Ys - cy, Xs - cx)
+    radii.setflags(write=False)
+    return radii
+
+
 def frame_angles(frame: ArrayLike, center=None, conv: Literal["image", "astro"] = "image"):
     """Return the angles of pixels around ``center`` in the image
 
@@ -62,7 +74,7 @@ def frame_angles(frame: ArrayLike, center=None, conv: Literal["image", "astro"]
         Matrix with frame angles
     """
     if center is None:
-        center = frame_center(frame)
+        return _frame_angles_default(frame.shape[-2:], conv.lower())
 
     match conv.lower():
         case "image":
@@ -71,6 +83,22 @@ def frame_angles(frame: ArrayLike, center=None, conv: Literal["image", "astro"]
             return frame_angles_astro(frame, center)
 
 
+@lru_cache(maxsize=32)
+def _frame_angles_default(shape: tuple[int, int], conv: str) -> NDArray:
+    # like _frame_radii_default- pure function of shape, shared read-only
+    frame = np.empty(shape)
+    center = frame_center(frame)
+    match conv:
+        case "image":
+            thetas = frame_angles_image(frame, center)
+        case "astro":
+            thetas = frame_angles_astro(frame, center)
+        case _:
+            return None
+    thetas.setflags(write=False)
+    return thetas
+
+
 def frame_angles_image(frame, center):
     Ys, Xs = np.ogrid[0 : frame.shape[-2], 0 : frame.shape[-1]]
     thetas = np.arctan2(Ys - center[-2], Xs - center[-1])
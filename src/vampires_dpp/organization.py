@@ -2,6 +2,7 @@ import multiprocessing as mp
 import shutil
 import subprocess
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from os import PathLike
 from pathlib import Path
 
@@ -11,7 +12,7 @@ from astropy.io import fits
 from tqdm.auto import tqdm
 
 from .headers import fix_header
-from .util import load_fits_header
+from .util import fpacked, load_fits_header
 
 
 def dict_from_header_file(filename: PathLike, ext=0, **kwargs) -> OrderedDict:
@@ -77,10 +78,12 @@ def header_table(
     """
     if num_proc is None:
         num_proc = min(8, mp.cpu_count())
-    with mp.Pool(num_proc) as pool:
-        jobs = [pool.apply_async(dict_from_header_file, args=(f,), kwds=kwargs) for f in filenames]
+    # header parsing is I/O-bound, so threads beat processes here- no fork
+    # startup and no pickling each row dict back to the parent
+    with ThreadPoolExecutor(num_proc) as pool:
+        jobs = [pool.submit(dict_from_header_file, f, **kwargs) for f in filenames]
         iter = jobs if quiet else tqdm(jobs, desc="Parsing FITS headers")
-        rows = [job.get() for job in iter]
+        rows = [job.result() for job in iter]
 
     return pd.DataFrame(rows)
 
@@ -245,7 +248,7 @@ def check_file(filename) -> bool:
         Returns True if file can be loaded and no empty frames
     """
     path = Path(filename)
-    ext = 1 if ".fits.fz" in path.name else 0
+    ext = 1 if fpacked(path) else 0
     with fits.open(path) as hdus:
         hdr = hdus[ext].header
         data = hdus[ext].data
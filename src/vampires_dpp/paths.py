@@ -1,6 +1,14 @@
 import re
+from functools import lru_cache
 from pathlib import Path
 
+# compiled once; get_paths runs for every file at every pipeline stage
+_FITS_EXT_RE = re.compile(r"\.fits(\..*)?")
+
+# directories already created by get_paths, so each output directory costs one
+# mkdir per process instead of one per file
+_created_dirs: set[Path] = set()
+
 
 class Paths:
     def __init__(self, workdir=None):
@@ -94,20 +102,30 @@ def get_paths(
         output_directory = path.parent
     else:
         output_directory = Path(output_directory)
-        output_directory.mkdir(parents=True, exist_ok=True)
+        if output_directory not in _created_dirs:
+            output_directory.mkdir(parents=True, exist_ok=True)
+            _created_dirs.add(output_directory)
     if outname is None:
-        outname = re.sub(r"\.fits(\..*)?", f"{_suffix}{filetype}", path.name)
+        outname = _FITS_EXT_RE.sub(f"{_suffix}{filetype}", path.name)
     outpath = output_directory / outname
     return path, outpath
 
 
+@lru_cache(maxsize=None)
+def _input_mtime(filename: str) -> float:
+    # inputs are not rewritten once a stage consumes them, so one stat per
+    # file per process is enough even when many outputs share the same inputs
+    return Path(filename).stat().st_mtime
+
+
 def any_file_newer(filenames, outpath):
+    # the output is the file being (re)written, so always stat it fresh
     out_mt = Path(outpath).stat().st_mtime
     # check if input is only a single file
     if isinstance(filenames, Path | str):
-        return Path(filenames).stat().st_mtime > out_mt
+        return _input_mtime(str(filenames)) > out_mt
     else:
-        return any(Path(f).stat().st_mtime > out_mt for f in filenames)
+        return any(_input_mtime(str(f)) > out_mt for f in filenames)
 
 
 def get_reduced_path(paths: Paths, config, group_key: str) -> Path:
@@ -10,23 +10,20 @@ from vampires_dpp.wcs import apply_wcs
 
 
 def get_singlediff_sets(table):
-    path_sets = []
-    for _k, group in table.sort_values(["MJD", "U_CAMERA", "U_FLC"]).groupby("MJD"):
-        if len(group) == 2:
-            path_sets.append(group["path"])
-        elif len(group) == 4:  # if FLC deinterleaved, create two different single diff images
-            for _, grp in group.groupby("U_FLC"):
-                path_sets.append(grp["path"])
-    return path_sets
+    sorted_table = table.sort_values(["MJD", "U_CAMERA", "U_FLC"])
+    # filter on precomputed group sizes instead of branching per group
+    sizes = sorted_table.groupby("MJD")["MJD"].transform("size")
+    valid = sorted_table.loc[sizes.isin((2, 4))].copy()
+    # FLC-deinterleaved groups (size 4) split into one set per FLC state
+    valid["_DIFF_KEY"] = np.where(sizes.loc[valid.index] == 4, valid["U_FLC"], "")
+    return [group for _, group in valid.groupby(["MJD", "_DIFF_KEY"])["path"]]
 
 
 def get_doublediff_sets(table):
-    path_sets = []
-    for _, group in table.sort_values(["MJD", "U_CAMERA", "U_FLC"]).groupby("MJD"):
-        if len(group) < 4:
-            continue
-        path_sets.append(group["path"])
-    return path_sets
+    sorted_table = table.sort_values(["MJD", "U_CAMERA", "U_FLC"])
+    sizes = sorted_table.groupby("MJD")["MJD"].transform("size")
+    valid = sorted_table.loc[sizes >= 4]
+    return [group for _, group in valid.groupby("MJD")["path"]]
 
 
 def singlediff_images(paths, outpath: Path, force: bool = False) -> Path:
@@ -100,8 +97,15 @@ def doublediff_images(paths, outpath: Path, force: bool = False) -> Path:
     diff_A = data[1, "A"] - data[2, "A"]
     diff_B = data[1, "B"] - data[2, "B"]
     double_diff = 0.5 * (diff_A - diff_B)
-    double_sum = 2 * np.mean(list(data.values()), axis=0)
-    double_err = 0.5 * np.sqrt(np.sum(np.power(list(errs.values()), 2), axis=0))
+    # accumulate in place instead of stacking all four cubes into a temporary
+    double_sum = data[1, "A"] + data[2, "A"]
+    double_sum += data[1, "B"]
+    double_sum += data[2, "B"]
+    double_sum *= 0.5
+    sq_err = np.square(errs[1, "A"])
+    for key in ((2, "A"), (1, "B"), (2, "B")):
+        sq_err += np.square(errs[key])
+    double_err = 0.5 * np.sqrt(sq_err, out=sq_err)
     prim_hdr = combine_frames_headers(list(prim_hdrs.values()))
     if "NCOADD" in prim_hdr:
         prim_hdr["NCOADD"] /= 4
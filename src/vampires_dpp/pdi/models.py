@@ -1,4 +1,5 @@
 import warnings
+from functools import lru_cache
 from pathlib import Path
 from typing import Final
 
@@ -19,10 +20,17 @@ MM_URL = f"https://docs.google.com/spreadsheets/d/{MM_KEY}/gviz/tq?tqx=out:csv&s
 MBI_MM_DICT: Final[dict[str, str]] = {"F610": "625", "F670": "675", "F720": "725", "F760": "750"}
 
 
-def load_calibration_file(header):
-    table = pd.read_csv(
+@lru_cache(maxsize=1)
+def _load_calibration_table():
+    # parse the calibration spreadsheet once- load_calibration_file is called
+    # for every field HDU of every file and the table never changes mid-run
+    return pd.read_csv(
         download_file(MM_URL, cache=True), header=0, index_col=0, dtype={"filter": str}
     )
+
+
+def load_calibration_file(header):
+    table = _load_calibration_table()
     filt = header["FILTER01"]
     if "MBI" in header["OBS-MOD"]:
         table_key = MBI_MM_DICT[header["FIELD"]] if "FIELD" in header else "675"
@@ -1,7 +1,8 @@
 import itertools
 from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import TypeVar
+from typing import Final, TypeVar
 
 import bottleneck as bn
 import numpy as np
@@ -20,8 +21,7 @@ from vampires_dpp.wcs import apply_wcs
 from .analysis import add_star_pol_hdul
 from .utils import (
     calculate_pol_efficiency,
-    measure_instpol,
-    measure_instpol_ann,
+    measure_instpol_stokes,
     rotate_stokes,
     write_stokes_products,
 )
@@ -58,33 +58,43 @@ def polarization_calibration_triplediff(filenames: Sequence[str], derotate: bool
     # now do triple-differential calibration
     cube_dict = {}
     header_dict = {}
-    cube_errs = {}
+    sum_err2 = None
     headers: dict[str, fits.Header] = {}
-    for file in filenames:
+
+    def _load_one(file):
         with fits.open(file) as hdul:
-            cube = hdul[0].data
-            cube_err = hdul["ERR"].data
+            # pin the diff math to float32- scaled FITS reads come back as
+            # float64, which would double the bandwidth of every step below
+            cube = hdul[0].data.astype("f4", copy=False)
+            cube_err = hdul["ERR"].data.astype("f4", copy=False)
             prim_hdr = hdul[0].header
-            create_or_append(headers, "PRIMARY", prim_hdr)
-            for hdu in hdul[2:]:
-                hdr = apply_wcs(cube, hdu.header, angle=0)
-                create_or_append(headers, hdr["FIELD"], hdr)
+            field_hdrs = [apply_wcs(cube, hdu.header, angle=0) for hdu in hdul[2:]]
         # derotate frame - necessary for crosstalk correction
         if derotate:
             cube = derotate_cube(cube, prim_hdr["DEROTANG"])
             cube_err = derotate_cube(cube_err, prim_hdr["DEROTANG"])
             prim_hdr = apply_wcs(cube, prim_hdr, angle=0)
-        # store into dictionaries
-        key = prim_hdr["RET-ANG1"], prim_hdr["U_FLC"], prim_hdr["U_CAMERA"]
-        header_dict[key] = prim_hdr
-        cube_dict[key] = cube
-        cube_errs[key] = cube_err
+        return prim_hdr, field_hdrs, cube, np.square(cube_err)
+
+    # the loads dominate this loop and astropy's readers release the GIL, so
+    # overlap a few files at a time; the in-order map keeps the squared-error
+    # accumulation streaming instead of holding all 16 error cubes
+    with ThreadPoolExecutor(max_workers=min(4, len(filenames))) as pool:
+        for prim_hdr, field_hdrs, cube, sq_err in pool.map(_load_one, filenames):
+            create_or_append(headers, "PRIMARY", prim_hdr)
+            for hdr in field_hdrs:
+                create_or_append(headers, hdr["FIELD"], hdr)
+            # store into dictionaries
+            key = prim_hdr["RET-ANG1"], prim_hdr["U_FLC"], prim_hdr["U_CAMERA"]
+            header_dict[key] = prim_hdr
+            cube_dict[key] = cube
+            sum_err2 = sq_err if sum_err2 is None else sum_err2 + sq_err
     assert len(cube_dict) == 16
 
     stokes_cube = triple_diff_dict(cube_dict)
     # swap stokes and field axes so field is first
     stokes_cube = np.swapaxes(stokes_cube, 0, 1)
-    stokes_err = np.sqrt(np.sum(np.power(list(cube_errs.values()), 2), axis=0)) / 16
+    stokes_err = np.sqrt(sum_err2) / 16
     stokes_err = np.swapaxes((stokes_err, stokes_err, stokes_err, stokes_err), 0, 1)
 
     stokes_hdrs: dict[str, fits.Header] = {}
@@ -175,7 +185,7 @@ def polarization_calibration_doublediff(filenames: Sequence[str], derotate: bool
     # now do double-differential calibration
     cube_dict = {}
     header_dict = {}
-    cube_errs = {}
+    sum_err2 = None
     headers: dict[str, fits.Header] = {}
     for file in filenames:
         with fits.open(file) as hdul:
@@ -195,12 +205,14 @@ def polarization_calibration_doublediff(filenames: Sequence[str], derotate: bool
         key = prim_hdr["RET-ANG1"], prim_hdr["U_CAMERA"]
         header_dict[key] = prim_hdr
         cube_dict[key] = cube
-        cube_errs[key] = cube_err
+        # fold the squared errors in as each file loads so the 8 error cubes
+        # never sit in memory together
+        sum_err2 = np.square(cube_err) if sum_err2 is None else sum_err2 + np.square(cube_err)
 
     stokes_cube = double_diff_dict(cube_dict)
     # swap stokes and field axes so field is first
     stokes_cube = np.swapaxes(stokes_cube, 0, 1)
-    stokes_err = np.sqrt(np.sum(np.power(list(cube_errs.values()), 2), axis=0)) / 8
+    stokes_err = np.sqrt(sum_err2) / 8
     stokes_err = np.swapaxes((stokes_err, stokes_err, stokes_err, stokes_err), 0, 1)
 
     stokes_hdrs: dict[str, fits.Header] = {}
@@ -307,83 +319,77 @@ def make_doublediff_dict(filenames):
 
 T = TypeVar("T")
 
+_TRIPLEDIFF_ORDER: Final = tuple(itertools.product((0.0, 45.0, 22.5, 67.5), ("A", "B"), (1, 2)))
+_DOUBLEDIFF_ORDER: Final = tuple(itertools.product((0.0, 45.0, 22.5, 67.5), (1, 2)))
+
+
+def _diff_weights(order) -> NDArray:
+    # the nested half-sum/half-difference ladders are a fixed linear map, so
+    # each input carries a constant +-1/2**depth coefficient into the
+    # (IQ, IU, Q, U) outputs
+    weights = np.zeros((4, len(order)))
+    for i, key in enumerate(order):
+        hwp, cam = key[0], key[-1]
+        sign = 1 if cam == 1 else -1
+        if len(key) == 3 and key[1] == "B":
+            sign = -sign
+        scale = 0.5 ** len(key)
+        if hwp in (0.0, 45.0):
+            weights[0, i] = scale
+            weights[2, i] = scale * sign * (1 if hwp == 0.0 else -1)
+        else:
+            weights[1, i] = scale
+            weights[3, i] = scale * sign * (1 if hwp == 22.5 else -1)
+    return weights
 
-def triple_diff_dict(input_dict: dict[tuple[float, str, int], T]) -> tuple[T, T, T, T]:
-    ## make difference images
-    # single diff (cams)
-    pQ0 = 0.5 * (input_dict[(0.0, "A", 1)] - input_dict[(0.0, "A", 2)])
-    pIQ0 = 0.5 * (input_dict[(0.0, "A", 1)] + input_dict[(0.0, "A", 2)])
-    pQ1 = 0.5 * (input_dict[(0.0, "B", 1)] - input_dict[(0.0, "B", 2)])
-    pIQ1 = 0.5 * (input_dict[(0.0, "B", 1)] + input_dict[(0.0, "B", 2)])
-
-    mQ0 = 0.5 * (input_dict[(45.0, "A", 1)] - input_dict[(45.0, "A", 2)])
-    mIQ0 = 0.5 * (input_dict[(45.0, "A", 1)] + input_dict[(45.0, "A", 2)])
-    mQ1 = 0.5 * (input_dict[(45.0, "B", 1)] - input_dict[(45.0, "B", 2)])
-    mIQ1 = 0.5 * (input_dict[(45.0, "B", 1)] + input_dict[(45.0, "B", 2)])
-
-    pU0 = 0.5 * (input_dict[(22.5, "A", 1)] - input_dict[(22.5, "A", 2)])
-    pIU0 = 0.5 * (input_dict[(22.5, "A", 1)] + input_dict[(22.5, "A", 2)])
-    pU1 = 0.5 * (input_dict[(22.5, "B", 1)] - input_dict[(22.5, "B", 2)])
-    pIU1 = 0.5 * (input_dict[(22.5, "B", 1)] + input_dict[(22.5, "B", 2)])
-
-    mU0 = 0.5 * (input_dict[(67.5, "A", 1)] - input_dict[(67.5, "A", 2)])
-    mIU0 = 0.5 * (input_dict[(67.5, "A", 1)] + input_dict[(67.5, "A", 2)])
-    mU1 = 0.5 * (input_dict[(67.5, "B", 1)] - input_dict[(67.5, "B", 2)])
-    mIU1 = 0.5 * (input_dict[(67.5, "B", 1)] + input_dict[(67.5, "B", 2)])
-
-    # double difference (FLC1 - FLC2)
-    pQ = 0.5 * (pQ0 - pQ1)
-    pIQ = 0.5 * (pIQ0 + pIQ1)
-
-    mQ = 0.5 * (mQ0 - mQ1)
-    mIQ = 0.5 * (mIQ0 + mIQ1)
-
-    pU = 0.5 * (pU0 - pU1)
-    pIU = 0.5 * (pIU0 + pIU1)
-
-    mU = 0.5 * (mU0 - mU1)
-    mIU = 0.5 * (mIU0 + mIU1)
-
-    # triple difference (HWP1 - HWP2)
-    Q = 0.5 * (pQ - mQ)
-    IQ = 0.5 * (pIQ + mIQ)
-    U = 0.5 * (pU - mU)
-    IU = 0.5 * (pIU + mIU)
 
-    return IQ, IU, Q, U
+_TRIPLEDIFF_WEIGHTS: Final = _diff_weights(_TRIPLEDIFF_ORDER)
+_DOUBLEDIFF_WEIGHTS: Final = _diff_weights(_DOUBLEDIFF_ORDER)
 
 
-def double_diff_dict(input_dict: dict[tuple[float, str, int], T]) -> tuple[T, T, T, T]:
-    ## make difference images
-    # single diff (cams)
-    pQ = 0.5 * (input_dict[(0.0, 1)] - input_dict[(0.0, 2)])
-    pIQ = 0.5 * (input_dict[(0.0, 1)] + input_dict[(0.0, 2)])
-
-    mQ = 0.5 * (input_dict[(45.0, 1)] - input_dict[(45.0, 2)])
-    mIQ = 0.5 * (input_dict[(45.0, 1)] + input_dict[(45.0, 2)])
+def _apply_diff_weights(input_dict, order, weights) -> tuple[T, T, T, T]:
+    stack = np.stack([input_dict[key] for key in order])
+    if np.issubdtype(stack.dtype, np.floating):
+        # the coefficients are exact binary fractions, so downcasting them
+        # keeps float32 inputs from promoting
+        weights = weights.astype(stack.dtype, copy=False)
+    IQ, IU, Q, U = np.tensordot(weights, stack, axes=1)
+    return IQ, IU, Q, U
 
-    pU = 0.5 * (input_dict[(22.5, 1)] - input_dict[(22.5, 2)])
-    pIU = 0.5 * (input_dict[(22.5, 1)] + input_dict[(22.5, 2)])
 
-    mU = 0.5 * (input_dict[(67.5, 1)] - input_dict[(67.5, 2)])
-    mIU = 0.5 * (input_dict[(67.5, 1)] + input_dict[(67.5, 2)])
+def triple_diff_dict(input_dict: dict[tuple[float, str, int], T]) -> tuple[T, T, T, T]:
+    ## make difference images as one weighted reduction over the 16 inputs
+    # (single diff across cameras, double across FLC, triple across HWP)
+    return _apply_diff_weights(input_dict, _TRIPLEDIFF_ORDER, _TRIPLEDIFF_WEIGHTS)
 
-    # double difference (HWP1 - HWP2)
-    Q = 0.5 * (pQ - mQ)
-    IQ = 0.5 * (pIQ + mIQ)
-    U = 0.5 * (pU - mU)
-    IU = 0.5 * (pIU + mIU)
 
-    return IQ, IU, Q, U
+def double_diff_dict(input_dict: dict[tuple[float, str, int], T]) -> tuple[T, T, T, T]:
+    ## make difference images as one weighted reduction over the 8 inputs
+    # (single diff across cameras, double across HWP)
+    return _apply_diff_weights(input_dict, _DOUBLEDIFF_ORDER, _DOUBLEDIFF_WEIGHTS)
 
 
 def mueller_matrix_calibration(mueller_matrices: NDArray, cube: NDArray) -> NDArray:
-    stokes_cube = np.zeros_like(cube, shape=(mueller_matrices.shape[-1], *cube.shape[-2:]))
-    # go pixel-by-pixel
-    for i in range(cube.shape[-2]):
-        for j in range(cube.shape[-1]):
-            stokes_cube[:, i, j] = np.linalg.lstsq(mueller_matrices, cube[:, i, j], rcond=None)[0]
-
+    if mueller_matrices.ndim > 2:
+        # per-pixel Mueller stack (n_frames, n_stokes, Ny, Nx): batch the
+        # normal equations across pixels with stacked 4x4 solves
+        mm = np.moveaxis(mueller_matrices, (0, 1), (-2, -1))
+        pix = np.moveaxis(cube, 0, -1)
+        ata = np.einsum("...ni,...nj->...ij", mm, mm)
+        atb = np.einsum("...ni,...n->...i", mm, pix)
+        sol = np.linalg.solve(ata, atb[..., None])[..., 0]
+        stokes_cube = np.moveaxis(sol, -1, 0)
+    else:
+        # the same design matrix applies at every pixel; solve the normal
+        # equations directly (LU beats the SVD a pseudo-inverse would run)
+        # and keep pinv as the fallback for a degenerate matrix
+        flat = cube.reshape(cube.shape[0], -1)
+        mm_t = mueller_matrices.T
+        try:
+            sol = np.linalg.solve(mm_t @ mueller_matrices, mm_t @ flat)
+        except np.linalg.LinAlgError:
+            sol = np.linalg.pinv(mueller_matrices) @ flat
+        stokes_cube = sol.reshape(mueller_matrices.shape[-1], *cube.shape[-2:])
     return stokes_cube[:3]
 
 
@@ -403,8 +409,10 @@ def polarization_calibration_leastsq(filenames, mm_filenames, outname, force=Fal
         cube, hdr = load_fits(file, header=True, memmap=False)
         # rotate to N up E left
         cube_derot = derotate_frame(cube, hdr["DEROTANG"])
-        # get row vector for mueller matrix of each file
-        mueller_mat = load_fits(mm_file, memmap=False)[0]
+        # only the first Mueller row is used, so read just that slice instead
+        # of pulling the whole matrix cube into memory
+        with fits.open(mm_file) as mm_hdul:
+            mueller_mat = mm_hdul[0].section[0]
 
         cubes.append(cube_derot)
         headers.append(hdr)
@@ -433,14 +441,18 @@ def get_triplediff_set(table) -> dict | None:
     bad_matches = []
     while len(work_table) >= 16:
         row_set = work_table.iloc[:16]
-        for key in TRIPLEDIFF_SETS:
-            subset = row_set.query(
-                f"`RET-ANG1` == {key[0]} and U_FLC == '{key[1]}' and U_CAMERA == {key[2]}"
+        # one set comparison replaces a query-string parse per key
+        window_keys = set(
+            zip(
+                row_set["RET-ANG1"],
+                row_set["U_FLC"],
+                row_set["U_CAMERA"].astype(int),
+                strict=True,
             )
-            if len(subset) == 0:
-                # found a missing key!
-                row_set = None
-                break
+        )
+        if not TRIPLEDIFF_SETS <= window_keys:
+            # found a missing key!
+            row_set = None
 
         # if there's a missing key let's try sliding the window down to the next timestamp
         if row_set is None:
@@ -514,12 +526,13 @@ def get_doublediff_set(table) -> dict | None:
     bad_matches = []
     while len(work_table) >= 8:
         row_set = work_table.iloc[:8]
-        for key in DOUBLEDIFF_SETS:
-            subset = row_set.query(f"`RET-ANG1` == {key[0]} and U_CAMERA == {key[1]}")
-            if len(subset) == 0:
-                # found a missing key!
-                row_set = None
-                break
+        # one set comparison replaces a query-string parse per key
+        window_keys = set(
+            zip(row_set["RET-ANG1"], row_set["U_CAMERA"].astype(int), strict=True)
+        )
+        if not DOUBLEDIFF_SETS <= window_keys:
+            # found a missing key!
+            row_set = None
 
         # if there's a missing key let's try sliding the window down to the next timestamp
         if row_set is None:
@@ -649,6 +662,9 @@ def make_stokes_image(
     prim_hdr = stokes_hdul[0].header
     headers = [stokes_hdul[i].header for i in range(2, len(stokes_hdul))]
     mms = []
+    if mm_correct:
+        # scratch (2, Npix) buffer reused by the cross-talk solve each set
+        QU_buff = np.empty((2, stokes_data[0, 0].size), dtype=stokes_data.dtype)
     for i in range(stokes_data.shape[0]):
         stokes_frame = stokes_data[i]
         stokes_frame_err = stokes_err[i]
@@ -663,20 +679,29 @@ def make_stokes_image(
             mms.append(np.array((mmQ, mmU)))
             IQ, IU, Q, U = stokes_frame  # noqa: E741
             IQ_err, IU_err, Q_err, U_err = stokes_frame_err
-            # correct IP
+            # correct IP, writing the propagated errors into the output
             Q -= mmQ[0] * IQ
             U -= mmU[0] * IU
-            Q_err = np.hypot(Q_err, mmQ[0] * IQ_err)
-            U_err = np.hypot(U_err, mmU[0] * IU_err)
+            Q_err = np.hypot(Q_err, mmQ[0] * IQ_err, out=stokes_outerr[i, 2])
+            U_err = np.hypot(U_err, mmU[0] * IU_err, out=stokes_outerr[i, 3])
 
-            # correct cross-talk
-            Sarr = np.array((Q.ravel(), U.ravel()))
+            # correct cross-talk- the system is a square 2x2, so a direct
+            # solve avoids the SVD that lstsq would run every set
+            QU_buff[0] = Q.reshape(-1)
+            QU_buff[1] = U.reshape(-1)
             Marr = np.array((mmQ[1:3], mmU[1:3]))
-            res = np.linalg.lstsq(Marr, Sarr, rcond=None)[0]
-            Q = res[0].reshape(Q.shape[-2:])
-            U = res[1].reshape(U.shape[-2:])
-            stokes_frame = np.array((IQ, IU, Q, U))
-            stokes_frame_err = np.array((IQ_err, IU_err, Q_err, U_err))
+            res = np.linalg.solve(Marr, QU_buff)
+            # assemble straight into the preallocated outputs instead of
+            # stacking temporary 4-plane arrays that get copied again below
+            stokes_frame = stokes_outdata[i]
+            stokes_frame[0] = IQ
+            stokes_frame[1] = IU
+            stokes_frame[2] = res[0].reshape(Q.shape[-2:])
+            stokes_frame[3] = res[1].reshape(U.shape[-2:])
+            # Q_err/U_err already landed in planes 2 and 3 above
+            stokes_frame_err = stokes_outerr[i]
+            stokes_frame_err[0] = IQ_err
+            stokes_frame_err[1] = IU_err
             stokes_header[f"hierarch DPP PDI MM IP_PQ {field}"] = (
                 mmQ[0],
                 "DPP IP (I -> Q) from Mueller matrix",
@@ -740,15 +765,16 @@ def make_stokes_image(
 
 
 def polarization_ip_correct(stokes_data, phot_rad, method, header=None):
-    if method == "aperture":
-        pQ = measure_instpol(stokes_data[0], stokes_data[2], r=phot_rad[0])
-        pU = measure_instpol(stokes_data[1], stokes_data[3], r=phot_rad[0])
-    elif method == "annulus":
-        pQ = measure_instpol_ann(stokes_data[0], stokes_data[2], Rin=phot_rad[0], Rout=phot_rad[1])
-        pU = measure_instpol_ann(stokes_data[1], stokes_data[3], Rin=phot_rad[0], Rout=phot_rad[1])
-
-    stokes_data[2] -= pQ * stokes_data[0]
-    stokes_data[3] -= pU * stokes_data[1]
+    # both coefficients come from one fused pass over the Stokes planes
+    pQ, pU = measure_instpol_stokes(stokes_data, phot_rad, method=method)
+
+    # subtract in place with dtype-matched scalars so a float64 coefficient
+    # can't upcast (and silently double) the Stokes cube
+    scale = stokes_data.dtype.type
+    scratch = np.multiply(stokes_data[0], scale(pQ))
+    np.subtract(stokes_data[2], scratch, out=stokes_data[2])
+    np.multiply(stokes_data[1], scale(pU), out=scratch)
+    np.subtract(stokes_data[3], scratch, out=stokes_data[3])
 
     if header is not None:
         field = header["FIELD"]
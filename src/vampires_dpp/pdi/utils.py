@@ -1,4 +1,5 @@
 import warnings
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
@@ -12,6 +13,25 @@ from vampires_dpp.indexing import frame_angles, frame_center
 from vampires_dpp.wcs import apply_wcs
 
 
+@lru_cache(maxsize=8)
+def _aperture_geometry(shape: tuple[int, int], phot_rad: tuple, method: str):
+    # the aperture geometry only depends on the frame shape and radii, so the
+    # photutils overlap grids are built once and reused across frames
+    cy, cx = frame_center(np.empty(shape))
+    if method == "aperture":
+        aper = CircularAperture((cx, cy), phot_rad[0])
+    elif method == "annulus":
+        aper = CircularAnnulus((cx, cy), phot_rad[0], phot_rad[1])
+    else:
+        msg = f"Unrecognized IP measurement method '{method}'"
+        raise ValueError(msg)
+    aper_mask = aper.to_mask()
+    slc_frame, slc_mask = aper_mask.get_overlap_slices(shape)
+    weights = aper_mask.data[slc_mask]
+    in_aper = weights > 0
+    return slc_frame, in_aper, weights[in_aper]
+
+
 def measure_instpol(I: NDArray, X: NDArray, r=5, expected=0) -> float:  # noqa: E741
     """Use aperture photometry to estimate the instrument polarization.
 
@@ -30,26 +50,62 @@ def measure_instpol(I: NDArray, X: NDArray, r=5, expected=0) -> float:  # noqa:
     float
         The instrumental polarization coefficient
     """
-    cy, cx = frame_center(I)
-    aper = CircularAperture((cx, cy), r)
-    aper_mask = aper.to_mask()
+    slc_frame, in_aper, weights = _aperture_geometry(I.shape[-2:], (r,), "aperture")
     # take sum of each and reduce after (less noise than taking sum of divided image)
-    pX = np.nanmedian(aper_mask.get_values(X))
-    pI = np.nanmedian(aper_mask.get_values(I))
+    pX = np.nanmedian(X[slc_frame][in_aper] * weights)
+    pI = np.nanmedian(I[slc_frame][in_aper] * weights)
     return pX / pI - expected
 
 
 def measure_instpol_ann(I: NDArray, X: NDArray, Rin, Rout, expected=0) -> float:  # noqa: E741
+    slc_frame, in_aper, weights = _aperture_geometry(I.shape[-2:], (Rin, Rout), "annulus")
     # take sum of each and reduce after (less noise than taking sum of divided image)
-    cy, cx = frame_center(I)
-    aper = CircularAnnulus((cx, cy), Rin, Rout)
-    aper_mask = aper.to_mask()
-    # take sum of each and reduce after (less noise than taking sum of divided image)
-    pX = np.nanmedian(aper_mask.get_values(X))
-    pI = np.nanmedian(aper_mask.get_values(I))
+    pX = np.nanmedian(X[slc_frame][in_aper] * weights)
+    pI = np.nanmedian(I[slc_frame][in_aper] * weights)
     return pX / pI - expected
 
 
+def measure_instpol_stokes(stokes_frame: NDArray, phot_rad, method: str = "aperture"):
+    """Measure the I -> Q and I -> U instrument polarization of a Stokes frame.
+
+    Equivalent to calling `measure_instpol` (or `measure_instpol_ann`) once for
+    Q and once for U, but since the aperture geometry is shared the pixels of
+    all four Stokes planes are gathered with a single fancy index and reduced
+    in one median pass instead of four photutils mask extractions.
+
+    Parameters
+    ----------
+    stokes_frame : NDArray
+        Input Stokes frame (4, y, x) ordered (I_Q, I_U, Q, U)
+    phot_rad : tuple
+        Aperture radius (or inner and outer annulus radii) in pixels
+    method : str, optional
+        "aperture" or "annulus", by default "aperture"
+
+    Returns
+    -------
+    tuple[float, float]
+        The (pQ, pU) instrumental polarization coefficients
+    """
+    slc_frame, in_aper, weights = _aperture_geometry(
+        stokes_frame.shape[-2:], tuple(phot_rad), method
+    )
+    # mask-weighted values, matching ApertureMask.get_values
+    values = stokes_frame[(..., *slc_frame)][..., in_aper] * weights
+    med_IQ, med_IU, med_Q, med_U = np.nanmedian(values, axis=-1)
+    return med_Q / med_IQ, med_U / med_IU
+
+
+@lru_cache(maxsize=8)
+def _radial_phase_maps(shape: tuple[int, int], phi: float):
+    # the trig maps only depend on the frame shape and offset, and
+    # radial_stokes is called once per field with identical arguments- treat
+    # the returned arrays as read-only
+    thetas = frame_angles(np.empty(shape), conv="astro")
+    phase = np.exp(2j * (thetas + phi))
+    return phase.real, phase.imag
+
+
 def radial_stokes(stokes_cube: ArrayLike, stokes_err: ArrayLike | None = None, phi: float = 0):
     r"""Calculate the radial Stokes parameters from the given Stokes cube (4, N, M)
 
@@ -70,10 +126,9 @@ def radial_stokes(stokes_cube: ArrayLike, stokes_err: ArrayLike | None = None, p
     NDArray, NDArray
         Returns the tuple (Qphi, Uphi, Qphi_err, Uphi_err)
     """
-    thetas = frame_angles(stokes_cube, conv="astro")
-
-    cos2t = np.cos(2 * (thetas + phi))
-    sin2t = np.sin(2 * (thetas + phi))
+    # one complex exponential yields both trig terms in a single pass over
+    # the frame, memoized across the per-field calls
+    cos2t, sin2t = _radial_phase_maps(stokes_cube.shape[-2:], phi)
     Qphi = -cos2t * stokes_cube[2] - sin2t * stokes_cube[3]
     Uphi = sin2t * stokes_cube[2] - cos2t * stokes_cube[3]
 
@@ -150,11 +205,14 @@ def stokes_products(stokes_frame, stokes_err, phi=0, planetary: bool = False):
     # suppress all-divide error warnings
     with warnings.catch_warnings():
         warnings.simplefilter("ignore")
-        pi_err = np.hypot(
-            stokes_frame[3] * stokes_err[3], stokes_frame[2] * stokes_err[2]
-        ) / np.abs(pi)
+        # hypot is non-negative, so divide by pi directly instead of taking
+        # another full-frame abs
+        pi_err = (
+            np.hypot(stokes_frame[3] * stokes_err[3], stokes_frame[2] * stokes_err[2]) / pi
+        )
         aolp_err = (
-            np.hypot(stokes_frame[2] * stokes_err[3], stokes_frame[3] * stokes_err[2]) / pi**2
+            np.hypot(stokes_frame[2] * stokes_err[3], stokes_frame[3] * stokes_err[2])
+            / np.square(pi)
         )
 
     data = np.asarray((*stokes_frame, Qphi, Uphi, pi, aolp))
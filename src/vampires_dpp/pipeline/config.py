@@ -205,7 +205,7 @@ class AnalysisConfig(BaseModel):
 
         **File Outputs**
 
-        - For each file an `NPZ <https://numpy.org/doc/stable/reference/generated/numpy.savez_compressed.html>_` file is created in ``metrics/``
+        - For each file an `NPZ <https://numpy.org/doc/stable/reference/generated/numpy.savez.html>_` file is created in ``metrics/``
             - Keys are metrics/centroids/statistics
             - Values are arrays with dimensions ``(nfields, npsfs, nframes)``
 
@@ -1,5 +1,7 @@
-import multiprocessing as mp
+import itertools
+import os
 import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from functools import partial
 from pathlib import Path
 
@@ -13,7 +15,7 @@ from tqdm.auto import tqdm
 
 from vampires_dpp.analysis import analyze_file
 from vampires_dpp.calib.calib_files import match_calib_file
-from vampires_dpp.calib.calibration import calibrate_file
+from vampires_dpp.calib.calibration import calibrate_file, load_calib_frames
 from vampires_dpp.coadd import coadd_hdul, collapse_frames
 from vampires_dpp.combine_frames import (
     combine_frames_headers,
@@ -37,7 +39,7 @@ from vampires_dpp.pipeline.config import PipelineConfig
 from vampires_dpp.specphot.filters import determine_filterset_from_header
 from vampires_dpp.specphot.specphot import specphot_cal_hdul
 from vampires_dpp.synthpsf import create_synth_psf
-from vampires_dpp.util import get_center
+from vampires_dpp.util import get_centers
 from vampires_dpp.wcs import apply_wcs
 
 
@@ -51,8 +53,36 @@ class Pipeline:
         self.reproject_tforms = None
         self.config = config
         self.workdir = workdir if workdir is not None else Path.cwd()
+        self._executor = None
         self.paths = Paths(workdir=self.workdir)
         self.output_table_path = self.paths.aux / f"{self.config.name}_table.csv"
+        # typed binary cache alongside the CSV so reloads skip the text parse
+        self.output_table_cache_path = self.output_table_path.with_suffix(".pkl")
+
+    def _get_executor(self, num_proc: int | None = None) -> ProcessPoolExecutor:
+        # one worker pool reused across pipeline stages, created lazily so
+        # caches warmed in the parent (e.g. master calibration frames) are
+        # inherited by the forked workers
+        if self._executor is None:
+            # ship the pipeline to each worker once via the initializer rather
+            # than pickling it again with every submitted job
+            self._executor = ProcessPoolExecutor(
+                max_workers=num_proc, initializer=_init_worker, initargs=(self,)
+            )
+        return self._executor
+
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __getstate__(self):
+        # the initializer pickles the pipeline after the executor exists, and
+        # a live executor cannot pickle- drop it so spawn-based workers
+        # (macOS/Windows) receive the pipeline cleanly
+        state = self.__dict__.copy()
+        state["_executor"] = None
+        return state
 
     def run(self, filenames, num_proc: int | None = None, force=False):
         """Run the pipeline
@@ -88,26 +118,56 @@ class Pipeline:
             if len(self.calib_table) == 0:
                 msg = f"Could not find any FITS files in {self.config.calibrate.calib_directory} double-check config or set `calib_directory` to False"
                 raise ValueError(msg)
+            # warm the master-frame cache in the parent so the forked pool
+            # workers share the loaded arrays instead of re-reading them
+            for calib_path in self.calib_table["path"]:
+                load_calib_frames(str(calib_path))
 
         self.output_paths = []
-        with mp.Pool(num_proc) as pool:
-            jobs = []
-            for group_key, group in input_table.groupby("GROUP_KEY"):
-                output_path = get_reduced_path(self.paths, self.config, group_key)
-                if not force and output_path.exists():
-                    logger.debug(f"Skipping processing for group {output_path}")
-                    self.output_paths.append(output_path)
-                else:
-                    jobs.append(
-                        pool.apply_async(self.process_group, args=(group, group_key, output_path))
-                    )
-
-            for job in tqdm(jobs, desc="Processing files"):
-                self.output_paths.append(job.get())
+        output_rows = {}
+        job_args = []
+        # iterate contiguous key runs as iloc views, skipping the per-group
+        # DataFrame copies that groupby iteration would make
+        sorted_tbl = input_table.sort_values("GROUP_KEY").reset_index(drop=True)
+        group_keys = sorted_tbl["GROUP_KEY"].to_numpy()
+        bounds = _group_bounds(group_keys)
+        for lo, hi in zip(bounds[:-1], bounds[1:], strict=True):
+            group = sorted_tbl.iloc[lo:hi]
+            group_key = group_keys[lo]
+            output_path = get_reduced_path(self.paths, self.config, group_key)
+            if not force and output_path.exists():
+                logger.debug(f"Skipping processing for group {output_path}")
+                self.output_paths.append(output_path)
+            else:
+                job_args.append((group, group_key, output_path))
+        # dispatch the largest groups first so stragglers don't idle cores near
+        # the end of the run; short jobs backfill as workers free up
+        job_args.sort(key=_group_cost, reverse=True)
+        # only the file paths cross the process boundary- the header columns
+        # are already in the worker's pipeline copy where needed
+        slim_args = [
+            (list(group["path"]), group_key, output_path)
+            for group, group_key, output_path in job_args
+        ]
+        pool = self._get_executor(num_proc)
+        # consume results as workers finish- group sizes vary with HWP cycles,
+        # and the in-order iterator would sit on stragglers while finished
+        # results queue up behind them
+        futures = [pool.submit(_process_group_job, args) for args in slim_args]
+        for fut in tqdm(as_completed(futures), total=len(futures), desc="Processing files"):
+            output_path, row = fut.result()
+            self.output_paths.append(output_path)
+            output_rows[output_path] = row
         self.output_paths.sort()
 
         logger.info("Creating table from output headers")
-        self.output_table = header_table(self.output_paths, num_proc=num_proc, quiet=True)
+        # reuse the headers the workers just wrote; only files skipped above
+        # need to be read back from disk
+        missing = [path for path in self.output_paths if path not in output_rows]
+        if missing:
+            missing_rows = header_table(missing, num_proc=num_proc, quiet=True).to_dict("records")
+            output_rows.update(zip(missing, missing_rows, strict=True))
+        self.output_table = pd.DataFrame([output_rows[path] for path in self.output_paths])
         self.save_output_header()
 
         ## products
@@ -118,6 +178,7 @@ class Pipeline:
         if self.config.diff_images.make_diff:
             self.make_diff_images(self.output_table, force=force)
 
+        self._shutdown_executor()
         logger.success("Finished processing files")
 
     def run_polarimetry(self, num_proc, force=False):
@@ -130,7 +191,15 @@ class Pipeline:
             msg = f"Output table {self.output_table_path} cannot be found"
             raise RuntimeError(msg)
 
-        working_table = pd.read_csv(self.output_table_path, index_col=0).sort_values("MJD")
+        # prefer the typed cache when it is at least as fresh as the CSV
+        cache_path = self.output_table_cache_path
+        if (
+            cache_path.exists()
+            and cache_path.stat().st_mtime >= self.output_table_path.stat().st_mtime
+        ):
+            working_table = pd.read_pickle(cache_path).sort_values("MJD")
+        else:
+            working_table = pd.read_csv(self.output_table_path, index_col=0).sort_values("MJD")
 
         if self.config.polarimetry.mm_correct or self.config.polarimetry.method == "leastsq":
             working_table["mm_file"] = self.make_mueller_mats(working_table, num_proc=num_proc)
@@ -147,6 +216,7 @@ class Pipeline:
                 )
             case "leastsq":
                 self.polarimetry_leastsq(working_table, force=force, num_proc=num_proc)
+        self._shutdown_executor()
         logger.success("Finished PDI")
 
     def create_input_table(self, filenames, num_proc) -> pd.DataFrame:
@@ -169,7 +239,11 @@ class Pipeline:
                 centroids = tomli.load(fh)
             self.centroids[key] = {}
             for field, ctrs in centroids.items():
-                self.centroids[key][field] = np.flip(np.atleast_2d(ctrs), axis=-1)
+                # store compact contiguous arrays- these ride along in the
+                # worker initializer payload and feed vectorized flips
+                self.centroids[key][field] = np.ascontiguousarray(
+                    np.flip(np.atleast_2d(ctrs), axis=-1), dtype="f4"
+                )
 
             logger.debug(f"{key} frame center is {self.centroids[key]} (y, x)")
         return self.centroids
@@ -208,26 +282,32 @@ class Pipeline:
     def make_synth_psfs(self, input_table):
         # make PSFs ahead of time so they don't overwhelm
         # during multiprocessing
+        # only the filter-defining columns matter, so dedupe down to a handful
+        # of rows instead of parsing a Series per file
+        key_cols = ["OBS-MOD", "FILTER01", "FILTER02"]
+        unique_rows = input_table.drop_duplicates(subset=key_cols)
         filters = {}
-        for _, row in input_table.iterrows():
+        for _, row in unique_rows.iterrows():
             for filt in determine_filterset_from_header(row):
                 filters[filt] = row
 
-        self.synth_psfs = {}
-        for filt, row in filters.items():
-            psf = create_synth_psf(
+        # each filter is independent (separate cache file on disk), so build
+        # them concurrently- the propagations release the GIL in numpy
+        def _make_psf(item):
+            filt, row = item
+            return filt, create_synth_psf(
                 row, filt, npix=self.config.analysis.window_size, output_directory=self.paths.aux
             )
-            self.synth_psfs[filt] = psf
-
-    def process_group(self, group, group_key: str, output_path: Path):
-        # fix headers and calibrate
-        hdul_list = []
-        for _, row in group.iterrows():
-            logger.debug(f"Calibrating {row['path']}")
-            cur_hdul = self.calibrate_one(row["path"], row)
-            hdul_list.append(cur_hdul)
-        logger.debug(f"Finished calibrating {len(group)} files")
+
+        with ThreadPoolExecutor(max_workers=min(4, max(1, len(filters)))) as tex:
+            self.synth_psfs = dict(tex.map(_make_psf, filters.items()))
+
+    def process_group(self, paths, group_key: str, output_path: Path):
+        # fix headers and calibrate; threads overlap the per-file I/O since
+        # the numpy-heavy parts of calibration release the GIL
+        with ThreadPoolExecutor(max_workers=min(8, len(paths))) as tex:
+            hdul_list = list(tex.map(self.calibrate_one, paths))
+        logger.debug(f"Finished calibrating {len(paths)} files")
         logger.debug("Combining data into single HDU list")
         hdul = combine_hduls(hdul_list)
         if self.config.combine.save_intermediate:
@@ -252,7 +332,7 @@ class Pipeline:
                 hdul.writeto(outpath, overwrite=True)
                 logger.debug(f"Saved selected HDU list to {outpath.absolute()}")
                 outpath_np = outpath.with_suffix(".npz")
-                np.savez_compressed(outpath_np, metrics)
+                np.savez(outpath_np, metrics)
                 logger.debug(f"Saved selected metrics to {outpath_np.absolute()}")
             logger.debug(f"Finished frame selection for group {group_key}")
         ## Step 4: Registration
@@ -293,12 +373,13 @@ class Pipeline:
                 ]
                 cam_num = int(hdul[0].header["U_CAMERA"])
                 cam_key = f"cam{cam_num}"
-                window_centers = self.centroids[cam_key]
-                for key in window_centers:
-                    for idx in range(window_centers[key].shape[0]):
-                        window_centers[key][idx] = get_center(
-                            hdul[0].data, window_centers[key][idx], cam_num
-                        )
+                # build a local dict- the pipeline object now outlives a single
+                # job, so writing flipped centers back into self.centroids
+                # would re-flip them on the next group this worker handles
+                window_centers = {
+                    key: get_centers(hdul[0].data, ctrs, cam_num)
+                    for key, ctrs in self.centroids[cam_key].items()
+                }
                 hdul = recenter_hdul(
                     hdul, window_centers, method=self.config.coadd.recenter_method, psfs=psfs
                 )
@@ -307,7 +388,11 @@ class Pipeline:
         logger.debug(f"Saving reduced cube to {output_path.absolute()}")
         hdul.writeto(output_path, overwrite=True)
 
-        return output_path
+        # hand the freshly written header back so run() can assemble the
+        # output table without re-reading every file
+        row = {"path": str(output_path.resolve().absolute())}
+        row.update(dict_from_header(hdul[0].header))
+        return output_path, row
 
     def get_coordinate(self):
         if self.config.target is None:
@@ -315,7 +400,7 @@ class Pipeline:
         else:
             self.coord = self.config.target.get_coord()
 
-    def calibrate_one(self, path, fileinfo, force=False):
+    def calibrate_one(self, path, force=False):
         logger.debug("Starting data calibration")
         config = self.config.calibrate
         if config.save_intermediate:
@@ -350,7 +435,8 @@ class Pipeline:
     def analyze_one(self, hdul: fits.HDUList, metric_file, force=False):
         logger.debug("Starting frame analysis")
         if not force and metric_file.exists():
-            return np.load(metric_file)
+            with np.load(metric_file) as npz:
+                return dict(npz)
         config = self.config.analysis
         hdr = hdul[0].header
         if self.config.align.align and self.config.align.method == "dft":
@@ -358,7 +444,8 @@ class Pipeline:
         else:
             psfs = None
         key = f"cam{hdr['U_CAMERA']:.0f}"
-        outpath = analyze_file(
+        # analyze_file returns the metrics it just saved, skipping a re-read
+        return analyze_file(
             hdul,
             centroids=self.centroids.get(key, None),
             window_size=config.window_size,
@@ -372,88 +459,99 @@ class Pipeline:
             outpath=metric_file,
             force=force,
         )
-        return np.load(outpath)
 
     def save_output_header(self):
         self.output_table.to_csv(self.output_table_path)
+        self.output_table.to_pickle(self.output_table_cache_path)
         logger.info(f"Saved output header table to {self.output_table_path}")
         return self.output_table_path
 
     def save_adi_cubes(self, force: bool = False):
         output_path = self.paths.adi / f"{self.config.name}_adi_cube.fits"
-        angles_path = output_path.with_stem(output_path.stem.replace("_cube", "_angles"))
         if not force and output_path.exists():
-            if not angles_path.exists():
-                group_keys = ["MJD", "U_FLC"]
-                mask = self.output_table["U_FLC"].isna()
-                self.output_table.loc[mask, "U_FLC"] = "NA"
-                time_groups = self.output_table.sort_values(group_keys).groupby(group_keys)
-                angs = [group["DEROTANG"].mean() for _, group in time_groups]
-                fits.writeto(angles_path, np.array(angs, dtype="f4"), overwrite=True)
             return
         group_keys = ["MJD", "U_FLC"]
         mask = self.output_table["U_FLC"].isna()
         self.output_table.loc[mask, "U_FLC"] = "NA"
         time_groups = self.output_table.sort_values(group_keys).groupby(group_keys)
-        cubes = []
-        headers = []
+        groups = list(time_groups)
         logger.info("Stacking output files into ADI cubes")
-        for _key, group in tqdm(time_groups, desc="Loading and combining both cams"):
-            hduls = [fits.open(path) for path in group["path"]]
-            cube = np.mean([hdul[0].data for hdul in hduls], axis=0)
-            cubes.append(cube)
-            header = combine_frames_headers([hdul[0].header for hdul in hduls])
-            headers.append(header)
-        angs = np.array([hdr["DEROTANG"] for hdr in headers])
-        # stacked_hdul = combine_hduls(hduls)
+        first_hdr = fits.getheader(groups[0][1]["path"].iloc[0])
+        shape = tuple(first_hdr[f"NAXIS{i}"] for i in range(first_hdr["NAXIS"], 0, -1))
+        # first pass: headers only, so the combined primary header and
+        # derotation angles are known before any pixel data is read; the
+        # reads are I/O-bound, so thread them like header_table does
+        def _combine_group_headers(group):
+            return combine_frames_headers([fits.getheader(path) for path in group["path"]])
+
+        with ThreadPoolExecutor() as tex:
+            headers = list(tex.map(_combine_group_headers, (group for _key, group in groups)))
+        # single-allocation fill straight into float32, skipping the
+        # intermediate list and object-dtype conversion
+        angs = np.fromiter(
+            (hdr["DEROTANG"] for hdr in headers), dtype=np.float32, count=len(headers)
+        )
         prim_hdr = combine_frames_headers(headers)
-        stacked_hdul = fits.PrimaryHDU(np.array(cubes), header=prim_hdr)
-        stacked_hdul.writeto(output_path, overwrite=True)
+
+        def _load_group(paths):
+            frame = None
+            for path in paths:
+                with fits.open(path, memmap=True) as hdul:
+                    data = hdul[0].data
+                    frame = data.astype("f4") if frame is None else frame + data
+            return frame / len(paths)
+
+        # stream the stacked cube to disk group by group, so peak memory is a
+        # few in-flight frames rather than the full (ngroups, ...) cube
+        stream_hdr = fits.Header()
+        stream_hdr["SIMPLE"] = True
+        stream_hdr["BITPIX"] = -32
+        stream_hdr["NAXIS"] = len(shape) + 1
+        for axis, size in enumerate(reversed((len(groups), *shape)), start=1):
+            stream_hdr[f"NAXIS{axis}"] = size
+        stream_hdr.extend(prim_hdr, update=True)
+        # StreamingHDU appends to existing files, so clobber explicitly
+        output_path.unlink(missing_ok=True)
+        stream_hdu = fits.StreamingHDU(str(output_path), stream_hdr)
+        # the loads are storage-bound and astropy releases the GIL during I/O,
+        # so a thread pool scales the reads without pickling the arrays
+        job_args = [group["path"] for _key, group in groups]
+        with ThreadPoolExecutor() as pool:
+            job_iter = pool.map(_load_group, job_args)
+            for frame in tqdm(job_iter, total=len(job_args), desc="Loading and combining both cams"):
+                stream_hdu.write(frame)
+        stream_hdu.close()
+        # co-locate the derotation angles with the cube so downstream ADI
+        # tools get one file and one open
+        ang_hdr = fits.Header()
+        ang_hdr["EXTNAME"] = "ANGLES"
+        fits.append(output_path, angs, ang_hdr)
         logger.info(f"Saved ADI cube to {output_path}")
-        fits.writeto(angles_path, np.array(angs, dtype="f4"), overwrite=True)
-        # paths = []
-        # for cam_num, group in cam_groups:
-        #     cube_path = self.paths.adi / f"{self.config.name}_adi_cube_cam{cam_num:.0f}.fits"
-        #     paths.append(cube_path)
-        #     combine_frames_files(group["path"], output=cube_path, force=True, crop=False)
-        #     logger.info(f"Saved cam {cam_num:.0f} ADI cube to {cube_path}")
-        #     angles_path = cube_path.with_stem(f"{cube_path.stem}_angles")
-        #     angles = np.asarray(group["DEROTANG"], dtype="f4")
-        #     fits.writeto(angles_path, angles, overwrite=True)
-        #     logger.info(f"Saved cam {cam_num:.0f} ADI angles to {angles_path}")
 
     def make_diff_images(self, table, num_proc=None, force=False):
         logger.info("Making difference frames")
         self.diff_files = []
-        # do singlediff first, then deliberate to doublediff
-        path_sets = get_singlediff_sets(table)
-        diff_func = partial(singlediff_images)
-        outdir = self.paths.diff / "single"
-        outdir.mkdir(exist_ok=True)
-        with mp.Pool(num_proc) as pool:
-            jobs = []
-            for i, paths in enumerate(path_sets):
-                outpath = outdir / f"{self.config.name}_single_diff_{i:04d}.fits"
-                jobs.append(pool.apply_async(diff_func, args=(paths,), kwds=dict(outpath=outpath)))
-            self.diff_files.extend(
-                job.get() for job in tqdm(jobs, desc="Making single diff images")
-            )
+        # do singlediff first, then deliberate to doublediff; both stages
+        # share one submission loop and the same pool
+        stages = [("single", get_singlediff_sets(table), partial(singlediff_images))]
         if self.config.diff_images.save_double:
-            # now set for double-diff
-            path_sets = get_doublediff_sets(table)
-            diff_func = partial(doublediff_images, force=force)
-            outdir = self.paths.diff / "double"
+            stages.append(
+                ("double", get_doublediff_sets(table), partial(doublediff_images, force=force))
+            )
+        pool = self._get_executor(num_proc)
+        for key, path_sets, diff_func in stages:
+            outdir = self.paths.diff / key
             outdir.mkdir(exist_ok=True)
-
-            with mp.Pool(num_proc) as pool:
-                jobs = []
-                for i, paths in enumerate(path_sets):
-                    outpath = outdir / f"{self.config.name}_double_diff_{i:04d}.fits"
-                    jobs.append(
-                        pool.apply_async(diff_func, args=(paths,), kwds=dict(outpath=outpath))
-                    )
-
-                self.diff_files.extend(job.get() for job in tqdm(jobs, desc="Making diff images"))
+            # the diff jobs are small and numerous, so batch them to cut IPC costs
+            chunksize = max(1, len(path_sets) // (4 * (num_proc or os.cpu_count())))
+            job_args = [
+                (diff_func, paths, outdir / f"{self.config.name}_{key}_diff_{i:04d}.fits")
+                for i, paths in enumerate(path_sets)
+            ]
+            job_iter = pool.map(_run_diff_job, job_args, chunksize=chunksize)
+            self.diff_files.extend(
+                tqdm(job_iter, total=len(job_args), desc=f"Making {key} diff images")
+            )
         logger.info("Done making difference frames")
         return self.diff_files
 
@@ -465,16 +563,15 @@ class Pipeline:
             ideal=self.config.polarimetry.use_ideal_mm,
             force=force,
         )
-        with mp.Pool(num_proc) as pool:
-            jobs = []
-            for row in table.itertuples(index=False):
-                _, outpath = get_paths(row.path, suffix="mm", output_directory=self.paths.mm)
-                jobs.append(
-                    pool.apply_async(mueller_matrix_from_file, args=(row.path, outpath), kwds=kwds)
-                )
-
-            for job in tqdm(jobs, desc="Making Mueller matrices"):
-                mm_paths.append(job.get())
+        pool = self._get_executor(num_proc)
+        # one small job per file, so batch them instead of a round trip each
+        job_args = []
+        for row in table.itertuples(index=False):
+            _, outpath = get_paths(row.path, suffix="mm", output_directory=self.paths.mm)
+            job_args.append((row.path, outpath, kwds))
+        chunksize = max(1, len(job_args) // (4 * (num_proc or os.cpu_count())))
+        job_iter = pool.map(_run_mm_job, job_args, chunksize=chunksize)
+        mm_paths.extend(tqdm(job_iter, total=len(job_args), desc="Making Mueller matrices"))
 
         return mm_paths
 
@@ -496,8 +593,9 @@ class Pipeline:
             stokes_sets.to_csv(stokes_sets_path, index=False)
             logger.info(f"Saved HWP cycle combinations to {stokes_sets_path}")
 
-        stokes_data = []
-        stokes_err = []
+        stokes_data = None
+        sum_err2 = None
+        count_finite = None
         prim_hdrs = []
         stokes_hdrs = []
         stokes_func = partial(
@@ -517,31 +615,64 @@ class Pipeline:
             force=force,
         )
         # TODO this is kind of ugly
-        with mp.Pool(num_proc) as pool:
-            jobs = []
-            for set_idx, group in stokes_sets.query("STOKES_IDX != -1").groupby("STOKES_IDX"):
-                paths = group["path"]
-                outpath = self.paths.stokes / f"{self.config.name}_stokes_{set_idx:03d}.fits"
-                if config.mm_correct:
-                    mask = [p in paths.values for p in table["path"]]
-                    subset = table.loc[mask]
-                    mm_paths = subset["mm_file"]
-                else:
-                    mm_paths = None
-                if len(paths) != (16 if method == "triplediff" else 8):
-                    continue
-                jobs.append(pool.apply_async(stokes_func, args=(paths, outpath, mm_paths)))
-
-            for job in tqdm(jobs, desc="Creating Stokes images"):
-                outpath = job.get()
-                # use memmap=False to avoid "too many files open" effects
-                # another way would be to set ulimit -n <MAX_FILES>
-                with fits.open(outpath, memmap=False) as hdul:
-                    stokes_data.append(hdul[0].data)
-                    stokes_err.append(hdul["ERR"].data)
-                    prim_hdrs.append(hdul[0].header)
-                    hdrs = [hdul[i].header for i in range(2, len(hdul))]
-                    stokes_hdrs.append(hdrs)
+        pool = self._get_executor(num_proc)
+        jobs = []
+        existing_outputs = []
+        # one hash-indexed lookup instead of a Python membership scan per set
+        mm_lookup = table.set_index("path")["mm_file"] if config.mm_correct else None
+        # same boundary-split iteration as run()- only the path column is used;
+        # plain boolean masking skips the query-string parse
+        valid_sets = (
+            stokes_sets.loc[stokes_sets["STOKES_IDX"].to_numpy() != -1]
+            .sort_values("STOKES_IDX")
+            .reset_index(drop=True)
+        )
+        set_idxs = valid_sets["STOKES_IDX"].to_numpy()
+        bounds = _group_bounds(set_idxs)
+        for lo, hi in zip(bounds[:-1], bounds[1:], strict=True):
+            set_idx = set_idxs[lo]
+            paths = valid_sets["path"].iloc[lo:hi]
+            outpath = self.paths.stokes / f"{self.config.name}_stokes_{set_idx:03d}.fits"
+            if len(paths) != (16 if method == "triplediff" else 8):
+                continue
+            # short-circuit finished sets here instead of inside the worker-
+            # no reason to pickle the job just to discover the file exists
+            if not force and outpath.exists():
+                existing_outputs.append(outpath)
+                continue
+            mm_paths = mm_lookup.reindex(paths) if config.mm_correct else None
+            jobs.append(pool.submit(stokes_func, paths, outpath, mm_paths))
+
+        n_sets = len(jobs) + len(existing_outputs)
+        # the accumulators don't care about set order, so take results as they
+        # finish rather than blocking on the slowest submitted set
+        result_iter = itertools.chain(
+            (fut.result() for fut in as_completed(jobs)), existing_outputs
+        )
+        for idx, outpath in enumerate(
+            tqdm(result_iter, total=n_sets, desc="Creating Stokes images")
+        ):
+            # use memmap=False to avoid "too many files open" effects
+            # another way would be to set ulimit -n <MAX_FILES>
+            with fits.open(outpath, memmap=False) as hdul:
+                # pin everything to float32- nothing downstream needs 64-bit
+                # imagery and halving the bandwidth pays on the collapse
+                data = hdul[0].data.astype("f4", copy=False)
+                # the median collapse needs the full data cube, but the error
+                # and footprint reductions accumulate frame by frame, so the
+                # error cube never has to be held in memory
+                if stokes_data is None:
+                    stokes_data = np.empty((n_sets, *data.shape), dtype="f4")
+                    sum_err2 = np.zeros(data.shape, dtype="f4")
+                    count_finite = np.zeros(data.shape, dtype="f4")
+                stokes_data[idx] = data
+                sq_err = np.square(hdul["ERR"].data.astype("f4", copy=False))
+                np.nan_to_num(sq_err, copy=False)
+                sum_err2 += sq_err
+                count_finite += np.isfinite(data)
+                prim_hdrs.append(hdul[0].header)
+                hdrs = [hdul[i].header for i in range(2, len(hdul))]
+                stokes_hdrs.append(hdrs)
 
         ## Save CSV of Stokes values
         stokes_tbl = pd.DataFrame(
@@ -552,17 +683,13 @@ class Pipeline:
         logger.info(f"Saved table of Stokes file headers to {stokes_tbl_path}")
         ## Collapse outputs
         logger.info(f"Collapsing {stokes_sets['STOKES_IDX'].max() + 1} Stokes files...")
-        stokes_data = np.array(stokes_data)
-        stokes_err = np.array(stokes_err)
-        coll_frame, _ = collapse_frames(np.nan_to_num(stokes_data))
-        footprint = np.mean(np.isfinite(stokes_data).astype("f4"), axis=0)
+        coll_frame, _ = collapse_frames(np.nan_to_num(stokes_data, copy=False))
+        footprint = count_finite / stokes_data.shape[0]
         fits.writeto(
             self.paths.pdi / f"{self.config.name}_footprint.fits", footprint, overwrite=True
         )
         # coll_frame *= footprint
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore")
-            coll_err = np.sqrt(np.nansum(stokes_err**2, axis=0)) / stokes_err.shape[0]
+        coll_err = np.sqrt(sum_err2) / stokes_data.shape[0]
         nfields = len(stokes_hdrs[0])
         coll_hdrs = []
         for i in range(nfields):
@@ -570,13 +697,18 @@ class Pipeline:
             hdr = apply_wcs(coll_frame, combine_frames_headers(hdrs), angle=0)
             coll_hdrs.append(hdr)
 
-        # correct TINT to account for actual number of files used
-        tints = [fits.getval(path, "TINT") for path in np.unique(stokes_sets["path"])]
+        # correct TINT to account for actual number of files used; the values
+        # are already in the header table, so no need to reopen each file
+        tints = table.set_index("path")["TINT"].loc[pd.unique(stokes_sets["path"])]
         tint = np.sum(tints)
         for hdr in coll_hdrs:
             hdr["NCOADD"] = len(tints)
             hdr["TINT"] = tint
         prim_hdr = apply_wcs(coll_frame, combine_frames_headers(coll_hdrs), angle=0)
+        # snapshot before normalization- the wavelength-collapsed branch needs
+        # the same combined header, and the WCS only depends on the trailing
+        # frame shape, which the keepdims collapse preserves
+        comb_hdr_base = prim_hdr.copy()
         prim_hdr["NCOADD"] /= len(coll_hdrs)
         prim_hdr["TINT"] /= len(coll_hdrs)
         prim_hdu = fits.PrimaryHDU(coll_frame, header=prim_hdr)
@@ -596,7 +728,7 @@ class Pipeline:
                 warnings.simplefilter("ignore")
                 wave_coll_frame = np.nansum(coll_frame, axis=0, keepdims=True)
                 wave_err_frame = np.sqrt(np.nansum(coll_err**2, axis=0, keepdims=True))
-            wave_coll_hdr = apply_wcs(wave_coll_frame, combine_frames_headers(coll_hdrs), angle=0)
+            wave_coll_hdr = comb_hdr_base
             wave_coll_hdr["NCOADD"] /= len(coll_hdrs)
             wave_coll_hdr["TINT"] /= len(coll_hdrs)
             wave_coll_hdr["FIELD"] = "COMB"
@@ -630,6 +762,47 @@ class Pipeline:
         #     )
 
 
+# per-worker pipeline instance, set once by the executor initializer so each
+# job only carries its own arguments across the process boundary
+_worker_pipeline: Pipeline | None = None
+
+
+def _init_worker(pipeline: Pipeline):
+    global _worker_pipeline
+    _worker_pipeline = pipeline
+
+
+def _process_group_job(job_args):
+    return _worker_pipeline.process_group(*job_args)
+
+
+def _run_diff_job(job_args):
+    diff_func, paths, outpath = job_args
+    return diff_func(paths, outpath=outpath)
+
+
+def _run_mm_job(job_args):
+    path, outpath, kwds = job_args
+    return mueller_matrix_from_file(path, outpath, **kwds)
+
+
+def _group_bounds(sorted_keys) -> np.ndarray:
+    """Boundary indices of contiguous key runs in an already-sorted array."""
+    if len(sorted_keys) == 0:
+        return np.zeros(1, dtype=int)
+    changes = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    return np.concatenate(([0], changes, [len(sorted_keys)]))
+
+
+def _group_cost(job_args) -> float:
+    """Estimate the processing cost of a file group from its total pixel count."""
+    group = job_args[0]
+    npix = group["NAXIS1"] * group["NAXIS2"]
+    if "NAXIS3" in group.columns:
+        npix = npix * group["NAXIS3"].fillna(1)
+    return float(npix.sum())
+
+
 def recenter_centroids(centroids: dict) -> dict:
     output = {}
     for key, value in centroids.items():
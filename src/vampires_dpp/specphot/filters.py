@@ -1,4 +1,5 @@
 import urllib
+from functools import lru_cache
 from pathlib import Path
 from typing import Final
 
@@ -89,14 +90,19 @@ def save_filter_fits(filt: SpectralElement, outpath: Path, force=False) -> Path:
     return outpath
 
 
-def determine_filterset_from_header(header):
-    mod = header["OBS-MOD"]
+@lru_cache(maxsize=None)
+def _determine_filterset(mod, filter01, filter02):
     if mod.endswith("MBIR"):
         filts = ("F670", "F720", "F760")
     elif mod.endswith("MBI"):
         filts = ("F610", "F670", "F720", "F760")
     elif mod.endswith("SDI"):
-        filts = (header["FILTER02"],)
+        filts = (filter02,)
     else:
-        filts = (header["FILTER01"],)
+        filts = (filter01,)
     return filts
+
+
+def determine_filterset_from_header(header):
+    # memoized on the driving keys since this runs several times per group
+    return _determine_filterset(header["OBS-MOD"], header.get("FILTER01"), header.get("FILTER02"))
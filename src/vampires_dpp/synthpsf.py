@@ -53,7 +53,8 @@ def create_synth_psf(header, filt=None, npix=21, output_directory=None, nwave=7,
     above_50 = np.nonzero(through >= 0.5 * np.nanmax(through))
     waves = np.linspace(waves[above_50].min(), waves[above_50].max(), nwave)
 
-    field_sum = 0
+    # accumulate in a preallocated buffer instead of promoting from a Python 0
+    field_sum = np.zeros((npix, npix))
     for wave, through in zip(waves, obs_filt(waves), strict=True):
         wf = hp.Wavefront(pupil_field, wave.to("m").value)
         focal_plane = prop(wf).intensity * through.value
@@ -77,9 +77,14 @@ def check_version(config: str, dpp: str) -> bool:
     return flag
 
 
+def fpacked(filename) -> bool:
+    """Return whether the given file is fpack-compressed (``.fits.fz``), where the data live in extension 1."""
+    return Path(filename).name.endswith(".fits.fz")
+
+
 def load_fits(filename, ext=0, **kwargs):
     path = Path(filename)
-    if ".fits.fz" in path.name:
+    if fpacked(path):
         ext = 1
     try:
         return fits.getdata(path, ext=ext, **kwargs)
@@ -90,14 +95,14 @@ def load_fits(filename, ext=0, **kwargs):
 
 def load_fits_header(filename, ext=0, **kwargs):
     path = Path(filename)
-    if ".fits.fz" in path.name:
+    if fpacked(path):
         ext = 1
     return fits.getheader(path, ext=ext, **kwargs)
 
 
 def load_fits_key(filename, key, ext=0, **kwargs):
     path = Path(filename)
-    if ".fits.fz" in path.name:
+    if fpacked(path):
         ext = 1
     return fits.getval(path, key, ext=ext, **kwargs)
 
@@ -109,6 +114,19 @@ def create_or_append(dict, key, value):
         dict[key] = [value]
 
 
+def get_centers(frame, centroids, cam_num):
+    # vectorized get_center for a stack of (y, x) centroids- one pass over the
+    # array instead of a Python loop with an allocation per centroid. Always
+    # copy so neither camera path hands back a view of the caller's (possibly
+    # persistent) centroid state
+    ctrs = np.array(centroids)
+    if cam_num == 2:
+        return ctrs
+    Ny = frame.shape[-2]
+    ctrs[..., 0] = Ny - 1 - ctrs[..., 0]
+    return ctrs
+
+
 def get_center(frame, centroid, cam_num):
     # IMPORTANT we need to flip the centroids for cam1 since they
     # are saved from raw data but we have y-flipped the data
@@ -122,14 +140,21 @@ def get_center(frame, centroid, cam_num):
     return ctr
 
 
+def _time_midpoint(t_str: Time, t_end: Time) -> Time:
+    # average the two-double JD representation directly, which keeps full
+    # precision while skipping the TimeDelta subtract/add machinery
+    jd1 = 0.5 * (t_str.jd1 + t_end.jd1)
+    jd2 = 0.5 * (t_str.jd2 + t_end.jd2)
+    return Time(jd1, jd2, format="jd", scale=t_str.scale)
+
+
 def iso_time_stats(date: str, start_time: str, end_time: str) -> tuple[Time, Time, Time]:
     # get start time
     t_str = Time(f"{date}T{start_time}", format="fits", scale="utc")
     # get end time
     t_end = Time(f"{date}T{end_time}", format="fits", scale="utc")
     # get typical time as midpoint of two times
-    dt = (t_end - t_str) / 2
-    t_typ = t_str + dt
+    t_typ = _time_midpoint(t_str, t_end)
     # split on the space to remove date from timestamp
     return t_str, t_typ, t_end
 
@@ -140,8 +165,7 @@ def mjd_time_stats(start_mjd: str, end_mjd: str) -> tuple[Time, Time, Time]:
     # get end time
     t_end = Time(end_mjd, format="mjd")
     # get typical time as midpoint of two times
-    dt = (t_end - t_str) / 2
-    t_typ = t_str + dt
+    t_typ = _time_midpoint(t_str, t_end)
     # split on the space to remove date from timestamp
     return t_str, t_typ, t_end
 